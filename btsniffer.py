@@ -7,8 +7,14 @@ import json
 import time
 import shutil
 import csv
+import io
+import re
+import select
 import socket
+import struct
 import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List
 
@@ -18,6 +24,69 @@ import pwnagotchi.ui.fonts as fonts
 from pwnagotchi.ui.components import LabeledValue
 from pwnagotchi.ui.view import BLACK
 
+# Unknown command sent after every bluetoothctl command; its "Invalid command" reply marks end of output.
+# Numbered per call so a reply can never be mistaken for a later command's.
+_BTCTL_SENTINEL = '===END-{}==='
+# Unsolicited session events about any device, never part of a command's own output
+_BTCTL_EVENTS = ('[CHG]', '[NEW]', '[DEL]')
+_ANSI_RE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]|[\x01\x02]')
+_PROMPT_RE = re.compile(r'^(?:\[[^\]]*\][#>]\s*)+')
+# "Device <MAC> <name>" listing lines; session event lines ("[NEW] Device ...") don't match
+_DEV_RE = re.compile(r'^\s*Device\s+([0-9A-Fa-f:]{17})\s*(.*)$')
+_CSV_SPECIAL = (',', '"', '\r', '\n')
+
+# HCI packet types, opcodes and events used for raw LE scanning (scan_mode = 'hci')
+_HCI_COMMAND_PKT = 0x01
+_HCI_EVENT_PKT = 0x04
+_OGF_LE_CTL = 0x08
+_OCF_LE_SET_SCAN_PARAMETERS = 0x000B
+_OCF_LE_SET_SCAN_ENABLE = 0x000C
+_EVT_CMD_COMPLETE = 0x0E
+_EVT_CMD_STATUS = 0x0F
+_EVT_LE_META_EVENT = 0x3E
+_EVT_LE_ADVERTISING_REPORT = 0x02
+_AD_SHORT_NAME = 0x08
+_AD_COMPLETE_NAME = 0x09
+_AD_MANUFACTURER_DATA = 0xFF
+
+
+def _csv_field(value):
+    """Quote a free-text CSV field the way csv.writer's QUOTE_MINIMAL would"""
+    if any(c in value for c in _CSV_SPECIAL):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class _MultipartUpload:
+    """multipart/form-data body that streams a single file from disk in fixed-size chunks"""
+
+    def __init__(self, file_path, field='file', content_type='text/csv', chunk_size=65536):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        self._head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{os.path.basename(file_path)}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode()
+        self._tail = f'\r\n--{boundary}--\r\n'.encode()
+        self._length = len(self._head) + os.path.getsize(file_path) + len(self._tail)
+
+    def __len__(self):
+        # Lets requests send a Content-Length header instead of chunked encoding
+        return self._length
+
+    def __iter__(self):
+        yield self._head
+        with open(self.file_path, 'rb') as fp:
+            while True:
+                chunk = fp.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        yield self._tail
+
 
 class btsniffer(plugins.Plugin):
     """
@@ -43,6 +112,9 @@ class btsniffer(plugins.Plugin):
             'gps_host': '127.0.0.1',
             'gps_port': 2947,
             'upload_check_interval': 300,  # Check for uploads every 5 minutes
+            'upload_workers': 3,  # How many files to upload to WiGLE in parallel
+            'scan_mode': 'bluetoothctl',  # 'hci' reads LE advertisements from a raw HCI socket (BLE only)
+            'hci_device': 0,  # hciX adapter used when scan_mode is 'hci'
             'blacklist': [
                 "AA:BB:CC:DD:EE:FF",  # Ignore these BT mac addrs
                 "11:22:33:44:55:66",
@@ -63,6 +135,28 @@ class btsniffer(plugins.Plugin):
         self._last_upload_check = 0
         self._uploader_lock = threading.Lock()
         self._uploading = False
+        self._btctl = None
+        self._btctl_lock = threading.Lock()
+        self._btctl_seq = 0
+        self._btctl_retry_at = 0  # after a timeout, use one-shot calls until this time
+        self._stop_event = threading.Event()
+        self._gps_lock = threading.Lock()
+        self._gps_thread = None
+        self._last_tpv = None
+        self._last_tpv_at = 0
+        self._gps_connecting = False  # a connect attempt to gpsd is in progress
+        self._gps_connected_at = 0  # when the current gpsd connection was made, 0 if not connected
+        self._tpv_event = threading.Event()  # set while _last_tpv holds a report
+        self._csv_bytes = 0
+        self._blacklist = frozenset()
+        self._net_ok_until = 0
+        self._dirs_ready = False
+        self._http = None
+        self._ui = None
+        self._scan_thread = None
+        self._data_lock = threading.Lock()
+        # Rows are formatted into memory and appended to devices_file in one write
+        self._csv_buf = io.StringIO()
 
     # ---------------- lifecycle ----------------
     def on_loaded(self):
@@ -73,6 +167,7 @@ class btsniffer(plugins.Plugin):
             self.options['blacklist'] = [m.upper() for m in cfg_blacklist]
         except Exception:
             self.options['blacklist'] = []
+        self._blacklist = frozenset(self.options['blacklist'])
 
         # Load WiGLE credentials from config into uploader_options
         self.uploader_options['wigle_name'] = self.options.get('wigle_name', '')
@@ -80,19 +175,14 @@ class btsniffer(plugins.Plugin):
         self.uploader_options['remove_on_success'] = self.options.get('remove_on_success', True)
         self.uploader_options['uploaded_path'] = self.options.get('uploaded_path', '/root/handshakes/uploaded/')
 
-        # Ensure directories
-        os.makedirs(
-            os.path.dirname(self.options['devices_file']),
-            exist_ok=True
-        )
-        os.makedirs(self.uploader_options['path'], exist_ok=True)
-        os.makedirs(self.uploader_options['uploaded_path'], exist_ok=True)
+        self._ensure_dirs()
 
         if not os.path.exists(self.options['devices_file']):
             self.write_csv_header()
         else:
             # Load already-logged devices from existing CSV to prevent duplicates
             self._load_existing_devices()
+            self._csv_bytes = os.path.getsize(self.options['devices_file'])
 
         logging.info(f"[BT-Sniffer] Output CSV: {self.options['devices_file']}")
         logging.info(f"[BT-Sniffer] Blacklist: {', '.join(self.options['blacklist']) or '(none)'}")
@@ -104,6 +194,50 @@ class btsniffer(plugins.Plugin):
         else:
             logging.warning("[BT-Sniffer] WiGLE credentials not configured - uploads will be skipped")
 
+        # Reuse pooled keep-alive connections to WiGLE across uploads
+        self._http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._http.mount('https://', adapter)
+
+        # Keep one bluetoothctl session open for all scans instead of spawning per command
+        with self._btctl_lock:
+            self._btctl_start()
+
+        # Stream TPV reports from gpsd in the background so scans just read the latest fix
+        self._stop_event.clear()
+        # Set before the thread starts so the scan worker's first scan waits for a fix
+        self._gps_connecting = True
+        self._gps_thread = threading.Thread(target=self._gps_reader, daemon=True)
+        self._gps_thread.start()
+
+        # Scans sleep for scan_duration, so run them off the UI thread
+        self._scan_thread = threading.Thread(target=self._scan_worker, daemon=True)
+        self._scan_thread.start()
+
+    def _ensure_dirs(self):
+        """Create the output, upload and uploaded directories once, rather than on every write"""
+        try:
+            os.makedirs(os.path.dirname(self.options['devices_file']), exist_ok=True)
+            os.makedirs(self.uploader_options['path'], exist_ok=True)
+            os.makedirs(self.uploader_options['uploaded_path'], exist_ok=True)
+            self._dirs_ready = True
+        except OSError as e:
+            logging.error(f"[BT-Sniffer] Unable to create directories: {e}")
+            self._dirs_ready = False
+        return self._dirs_ready
+
+    def on_unload(self, ui):
+        self._stop_event.set()
+        for t in (self._gps_thread, self._scan_thread):
+            if t is not None:
+                t.join(timeout=3)
+        with self._btctl_lock:
+            self._btctl_stop()
+        with self._data_lock:
+            self._flush_csv()
+        if self._http is not None:
+            self._http.close()
+
     def on_ui_setup(self, ui):
         with ui._lock:
             ui.add_element('BT-Sniffer', LabeledValue(
@@ -114,19 +248,14 @@ class btsniffer(plugins.Plugin):
                 label_font=fonts.Small,
                 text_font=fonts.Small
             ))
+        self._ui = ui
 
     def on_ui_update(self, ui):
         now = time.time()
-        
-        # Regular scanning
-        if now - self.last_scan_time >= int(self.options.get('timer', 45)):
-            self.last_scan_time = now
-            ui.set('BT-Sniffer', str(self.bt_sniff_info()))
-            try:
-                self.scan(ui)
-            except Exception as e:
-                logging.exception(f"[BT-Sniffer] Exception during scan: {e}")
-        
+
+        # Scanning happens in _scan_worker, just show the latest count
+        ui.set('BT-Sniffer', self.bt_sniff_info())
+
         # Periodic upload check - NEW!
         upload_interval = int(self.options.get('upload_check_interval', 300))
         if now - self._last_upload_check >= upload_interval:
@@ -158,6 +287,7 @@ class btsniffer(plugins.Plugin):
                 csvfile.write(pre_header)
                 writer = csv.writer(csvfile)
                 writer.writerow(header)
+                self._csv_bytes = csvfile.tell()
         except Exception as e:
             logging.error(f"[BT-Sniffer] Unable to write CSV header: {e}")
 
@@ -165,72 +295,105 @@ class btsniffer(plugins.Plugin):
         """Load MAC addresses from existing CSV file to prevent duplicate logging"""
         file_path = self.options['devices_file']
         try:
-            with open(file_path, 'r', newline='') as csvfile:
-                # Read first line to check for pre-header
-                first_line = csvfile.readline()
-                csvfile.seek(0)  # Reset to beginning
-                
-                reader = csv.reader(csvfile)
-                
-                # Skip pre-header line if present (WigleWifi-1.6...)
-                if first_line.startswith('WigleWifi'):
-                    next(reader, None)
-                
-                # Skip header row (MAC, SSID, etc.)
-                header = next(reader, None)
-                if not header or header[0] != 'MAC':
-                    # No valid header found, can't parse
-                    return
-                
-                # Read all data rows and extract MAC addresses
-                for row in reader:
-                    if len(row) > 0:
-                        mac = row[0].strip().upper()
-                        if mac and mac != 'MAC':  # Skip header if present
-                            # Store with first_seen from CSV if available
-                            if mac not in self.data:
-                                first_seen = row[3] if len(row) > 3 else datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-                                self.data[mac] = {'first_seen': first_seen}
+            with open(file_path, 'r', buffering=1 << 16) as csvfile:
+                for line in csvfile:
+                    # Skip pre-header (WigleWifi-1.6...) and header (MAC, SSID, etc.) lines
+                    if line.startswith('WigleWifi') or line.startswith('MAC,'):
+                        continue
+
+                    # MAC is always the fixed-width first column, no need for a full CSV parse
+                    mac = line[:17].upper()
+                    if len(mac) != 17 or mac[2] != ':' or mac in self.data:
+                        continue
+
+                    # Split from the right so commas in a quoted device name don't shift FirstSeen
+                    parts = line.rstrip('\r\n').rsplit(',', 12)
+                    if len(parts) == 13:
+                        first_seen = parts[2]
+                    else:
+                        first_seen = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+                    self.data[mac] = {'first_seen': first_seen}
         except Exception as e:
             logging.warning(f"[BT-Sniffer] Could not load existing devices from CSV: {e}")
             # If we can't read the file, start fresh
             self.data = {}
 
     # ---------------- GPSD ----------------
-    def get_gps_coords(self):
-        try:
-            host = self.options.get('gps_host', '127.0.0.1')
-            port = int(self.options.get('gps_port', 2947))
-            gps_data = None
+    def _gps_reader(self):
+        """Keep one gpsd connection open and record the latest TPV, reconnecting with backoff"""
+        host = self.options.get('gps_host', '127.0.0.1')
+        port = int(self.options.get('gps_port', 2947))
+        backoff = 1
+
+        while not self._stop_event.is_set():
+            self._gps_connecting = True
+            try:
+                sock = socket.create_connection((host, port), timeout=3)
+            except OSError as e:
+                self._gps_connecting = False
+                logging.debug(f"[BT-Sniffer] gpsd connect failed, retrying in {backoff}s: {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
 
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(3.0)
-                s.connect((host, port))
-                s.sendall(b'?WATCH={"enable":true,"json":true}\n')
+            try:
+                sock.sendall(b'?WATCH={"enable":true,"json":true}\n')
+                sock.setblocking(False)
+                self._gps_connected_at = time.time()
+                self._gps_connecting = False
+                backoff = 1
 
                 buf = ""
-                end = time.time() + 2.5
-                while time.time() < end:
-                    chunk = s.recv(4096).decode('utf-8', errors='ignore')
+                while not self._stop_event.is_set():
+                    r, _, _ = select.select([sock], [], [], 1)
+                    if not r:
+                        continue
+                    chunk = sock.recv(4096)
                     if not chunk:
                         break
-                    buf += chunk
+                    buf += chunk.decode('utf-8', errors='ignore')
 
-                    while '\n' in buf:
-                        line, buf = buf.split('\n', 1)
+                    *lines, buf = buf.split('\n')
+                    for line in lines:
                         try:
                             obj = json.loads(line)
-                            if obj.get('class') == 'TPV':
-                                gps_data = obj
-                                raise StopIteration
-                        except StopIteration:
-                            raise
-                        except Exception:
+                        except ValueError:
                             continue
-        except StopIteration:
-            pass
-        except Exception:
-            gps_data = None
+                        if obj.get('class') == 'TPV':
+                            with self._gps_lock:
+                                self._last_tpv = obj
+                                self._last_tpv_at = time.time()
+                            self._tpv_event.set()
+            except OSError as e:
+                logging.debug(f"[BT-Sniffer] gpsd connection error: {e}")
+            finally:
+                sock.close()
+                # Don't keep tagging rows with a fix from a dead connection
+                with self._gps_lock:
+                    self._last_tpv = None
+                self._tpv_event.clear()
+                self._gps_connected_at = 0
+                self._gps_connecting = False
+
+            if not self._stop_event.is_set():
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def get_gps_coords(self):
+        # Right after (re)connecting, e.g. the first scan after load, gpsd hasn't sent a TPV yet.
+        # Rows logged without a fix stay at 0,0 for good because of de-duplication, so block until
+        # the first report arrives, but only while connecting or within 2.5s of connecting. A gpsd
+        # that is up without a receiver, or unreachable, costs nothing on later scans.
+        while not self._tpv_event.is_set() and not self._stop_event.is_set():
+            if not (self._gps_connecting or time.time() - self._gps_connected_at < 2.5):
+                break
+            self._tpv_event.wait(0.1)
+
+        with self._gps_lock:
+            gps_data = self._last_tpv
+            # gpsd can stay connected but go quiet (receiver unplugged), don't reuse an old fix
+            if time.time() - self._last_tpv_at > 5:
+                gps_data = None
 
         if gps_data:
             lat = float(gps_data.get('lat', 0.0) or 0.0)
@@ -242,124 +405,401 @@ class btsniffer(plugins.Plugin):
         return 0.0, 0.0, 0.0, 0.0
 
     # ---------------- Bluetooth Scan ----------------
+    def _scan_worker(self):
+        """Run a scan every `timer` seconds until the plugin is unloaded"""
+        while not self._stop_event.is_set():
+            self.last_scan_time = time.time()
+            try:
+                self.scan(self._ui)
+            except Exception as e:
+                logging.exception(f"[BT-Sniffer] Exception during scan: {e}")
+
+            elapsed = time.time() - self.last_scan_time
+            self._stop_event.wait(max(0, int(self.options.get('timer', 45)) - elapsed))
+
     def scan(self, display):
         scan_duration = int(self.options.get('scan_duration', 10))
-        logging.info(f"[BT-Sniffer] Starting bluetoothctl scan for {scan_duration}s")
+        scan_mode = self.options.get('scan_mode', 'bluetoothctl')
+        logging.info(f"[BT-Sniffer] Starting {scan_mode} scan for {scan_duration}s")
 
         lat, lon, alt, acc = self.get_gps_coords()
         scan_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-
-        try:
-            subprocess.run("bluetoothctl scan on &", shell=True,
-                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            time.sleep(scan_duration)
-            subprocess.run("bluetoothctl scan off", shell=True,
-                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except Exception as e:
-            logging.debug(f"[BT-Sniffer] Error controlling bluetoothctl: {e}")
-
-        try:
-            output = subprocess.check_output(
-                "bluetoothctl devices", shell=True
-            ).decode(errors='ignore')
-        except subprocess.CalledProcessError:
-            output = ""
-
-        if not output:
+        # Position is fixed for the whole scan, format it once rather than per row
+        lat_s, lon_s, alt_s, acc_s = f"{lat:.9f}", f"{lon:.9f}", f"{alt:.1f}", f"{acc:.6f}"
+
+        devices = None
+        if scan_mode == 'hci':
+            devices = self._hci_scan(scan_duration)
+            if devices is None:
+                logging.warning("[BT-Sniffer] HCI scan unavailable, falling back to bluetoothctl")
+        if devices is None:
+            devices = self._bluetoothctl_scan(scan_duration)
+
+        if not devices:
             self.check_rollover()
-            display.update(force=True)
+            if display is not None:
+                display.update(force=True)
             return
 
-        rows_written = 0
-        for line in output.strip().splitlines():
-            if "Device " not in line:
-                continue
-
-            parts = line.strip().split(" ", 2)
-            if len(parts) < 2:
-                continue
+        # Only MAC, name, type, RSSI and manufacturer vary per row, bake the rest in once per scan.
+        # Row terminator matches csv.writer's default used for the header.
+        row_tmpl = f"%s,%s,Misc [%s],{scan_time},0,0,%d,{lat_s},{lon_s},{alt_s},{acc_s},,%s,%s\r\n"
 
-            mac = parts[1].upper()
-            name = parts[2].strip() if len(parts) > 2 else ""
+        rows_buffered = 0
+        for mac, name, info in devices:
+            # Plugin is unloading, stop querying devices and just flush what we have
+            if self._stop_event.is_set():
+                break
 
             # Skip blacklisted devices
-            if mac in self.options['blacklist']:
+            if mac in self._blacklist:
                 continue
 
-            # Skip if we've already logged this MAC before
-            if mac in self.data:
-                continue
+            with self._data_lock:
+                # Skip if we've already logged this MAC before
+                if mac in self.data:
+                    continue
 
-            # Mark device as seen
-            self.data[mac] = {'first_seen': scan_time}
+                # Mark device as seen
+                self.data[mac] = {'first_seen': scan_time}
 
-            # Fetch info
-            mfgr = self.get_device_manufacturer(mac)
-            rssi = self.get_device_rssi(mac)
-            devtype = self.get_device_type(mac)
+            # HCI scans already carry this sighting's info, bluetoothctl needs a lookup
+            if info is None:
+                info = self._get_device_info(mac)
+            mfgr, rssi, devtype = info
 
-            try:
-                with open(self.options['devices_file'], 'a', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow([
-                        mac,
-                        name,
-                        f"Misc [{devtype}]",
-                        self.data[mac]['first_seen'],
-                        0,
-                        0,
-                        rssi,
-                        f"{lat:.9f}",
-                        f"{lon:.9f}",
-                        f"{alt:.1f}",
-                        f"{acc:.6f}",
-                        '',
-                        mfgr,
-                        devtype
-                    ])
-                    rows_written += 1
-            except Exception as e:
-                logging.error(f"[BT-Sniffer] Error writing row {mac}: {e}")
+            row = row_tmpl % (mac, _csv_field(name), devtype, rssi, _csv_field(mfgr), devtype)
+            with self._data_lock:
+                self._csv_buf.write(row)
+                rows_buffered += 1
+                # Don't hold an unbounded amount of a very busy scan in memory
+                if self._csv_buf.tell() >= 8192:
+                    self._flush_csv()
 
-        if rows_written:
-            logging.info(f"[BT-Sniffer] Wrote {rows_written} rows.")
-            display.set('status', 'Bluetooth sniffed + stored')
+        # Flush at the end of every scan so a crash loses at most one scan's rows
+        with self._data_lock:
+            flushed = self._flush_csv()
+
+        if rows_buffered and flushed:
+            logging.info(f"[BT-Sniffer] Wrote {rows_buffered} rows.")
+            if display is not None:
+                display.set('status', 'Bluetooth sniffed + stored')
 
         self.check_rollover()
-        display.update(force=True)
+        if display is not None:
+            display.update(force=True)
 
-    # ---------------- Info helpers ----------------
-    def get_device_manufacturer(self, mac):
+    def _bluetoothctl_scan(self, scan_duration):
+        """Discover devices with bluetoothctl, returning a list of (mac, name, None)"""
+        if self._btctl_cmd("scan on") is not None:
+            self._stop_event.wait(scan_duration)
+            self._btctl_cmd("scan off")
+        else:
+            # Persistent session unavailable, fall back to one-shot invocations.
+            # --timeout makes bluetoothctl exit (ending discovery) on its own, no "scan off" needed
+            try:
+                proc = subprocess.Popen(["bluetoothctl", "--timeout", str(scan_duration), "scan", "on"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                if self._stop_event.wait(scan_duration):
+                    proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    logging.debug("[BT-Sniffer] bluetoothctl scan did not exit after --timeout, killing it")
+                    proc.kill()
+                    proc.wait()
+            except Exception as e:
+                logging.debug(f"[BT-Sniffer] Error controlling bluetoothctl: {e}")
+
+        output = self._btctl_cmd("devices")
+        if output is None:
+            try:
+                output = subprocess.check_output(
+                    ["bluetoothctl", "devices"], stderr=subprocess.DEVNULL
+                ).decode(errors='ignore')
+            except (subprocess.CalledProcessError, OSError):
+                output = ""
+
+        devices = []
+        for line in output.splitlines():
+            m = _DEV_RE.match(line)
+            if m:
+                devices.append((m.group(1).upper(), m.group(2).strip(), None))
+        return devices
+
+    def _hci_scan(self, scan_duration):
+        """
+        Discover BLE devices by reading LE advertising reports straight off a raw HCI socket.
+        Returns a list of (mac, name, (mfgr, rssi, type)), or None if the socket can't be used
+        so the caller can fall back.
+        """
         try:
-            out = subprocess.check_output(f"bluetoothctl info {mac}", shell=True).decode()
-            for line in out.splitlines():
-                if "Manufacturer" in line:
-                    return line.split(":", 1)[1].strip()
-        except Exception:
-            pass
-        return ''
+            sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_RAW, socket.BTPROTO_HCI)
+        except (AttributeError, OSError) as e:
+            logging.debug(f"[BT-Sniffer] Cannot open HCI socket: {e}")
+            return None
+
+        def hci_cmd(ocf, params, wait=True):
+            """Send an LE command, returning its status, or None if the controller never answered"""
+            opcode = (_OGF_LE_CTL << 10) | ocf
+            sock.send(struct.pack('<BHB', _HCI_COMMAND_PKT, opcode, len(params)) + params)
+            if not wait:
+                return 0
+
+            end = time.time() + 2
+            while True:
+                remaining = end - time.time()
+                if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+                    return None
+                pkt = sock.recv(1024)
+                if len(pkt) >= 7 and pkt[0] == _HCI_EVENT_PKT:
+                    # Command Complete: ncmd, opcode, status / Command Status: status, ncmd, opcode
+                    if pkt[1] == _EVT_CMD_COMPLETE and struct.unpack_from('<H', pkt, 4)[0] == opcode:
+                        return pkt[6]
+                    if pkt[1] == _EVT_CMD_STATUS and struct.unpack_from('<H', pkt, 5)[0] == opcode:
+                        return pkt[3]
+                self._parse_le_reports(pkt, found)
+
+        found = {}  # mac -> [name, rssi, mfgr], insertion ordered
+        try:
+            sock.bind((int(self.options.get('hci_device', 0)),))
+            # Only deliver Command Complete/Status (bits 14/15 of the first mask word) and LE meta
+            # events (0x3E is bit 30 of the second). struct hci_ufilter is padded to 16 bytes,
+            # the kernel rejects anything shorter
+            sock.setsockopt(socket.SOL_HCI, socket.HCI_FILTER,
+                            struct.pack('<IIIH2x', 1 << _HCI_EVENT_PKT,
+                                        (1 << _EVT_CMD_COMPLETE) | (1 << _EVT_CMD_STATUS),
+                                        1 << (_EVT_LE_META_EVENT - 32), 0))
+            # Active scan so scan responses (which usually carry the name) are reported too.
+            # A controller that rejects these (e.g. Command Disallowed while bluetoothd is
+            # scanning) would otherwise just report nothing, so fall back to bluetoothctl instead
+            for ocf, params in ((_OCF_LE_SET_SCAN_PARAMETERS, struct.pack('<BHHBB', 0x01, 0x0010, 0x0010, 0x00, 0x00)),
+                                (_OCF_LE_SET_SCAN_ENABLE, struct.pack('<BB', 0x01, 0x00))):
+                status = hci_cmd(ocf, params)
+                if status != 0:
+                    logging.debug(f"[BT-Sniffer] HCI command 0x{ocf:04x} failed (status {status})")
+                    return None
+
+            end = time.time() + scan_duration
+            while not self._stop_event.is_set():
+                remaining = end - time.time()
+                if remaining <= 0:
+                    break
+                r, _, _ = select.select([sock], [], [], min(remaining, 1.0))
+                if not r:
+                    continue
+                self._parse_le_reports(sock.recv(1024), found)
+        except OSError as e:
+            logging.debug(f"[BT-Sniffer] HCI scan error: {e}")
+            if not found:
+                return None
+        finally:
+            try:
+                hci_cmd(_OCF_LE_SET_SCAN_ENABLE, struct.pack('<BB', 0x00, 0x00), wait=False)
+            except OSError:
+                pass
+            sock.close()
+
+        return [(mac, name, (mfgr, rssi, "BLE")) for mac, (name, rssi, mfgr) in found.items()]
+
+    @staticmethod
+    def _parse_le_reports(pkt, found):
+        """Merge the advertising reports in one HCI LE meta event packet into found"""
+        if len(pkt) < 5 or pkt[0] != _HCI_EVENT_PKT or pkt[1] != _EVT_LE_META_EVENT \
+                or pkt[3] != _EVT_LE_ADVERTISING_REPORT:
+            return
+
+        # Reports are laid out back to back: evt_type, addr_type, addr[6], data_len, data, rssi
+        pos = 5
+        for _ in range(pkt[4]):
+            if pos + 9 > len(pkt):
+                return
+            mac = ':'.join(f"{b:02X}" for b in reversed(pkt[pos + 2:pos + 8]))
+            data_len = pkt[pos + 8]
+            data = pkt[pos + 9:pos + 9 + data_len]
+            pos += 9 + data_len
+            if pos >= len(pkt):
+                return
+            rssi = struct.unpack_from('b', pkt, pos)[0]
+            pos += 1
+
+            info = found.setdefault(mac, ['', 0, ''])
+            if rssi != 127:  # 127 = RSSI not available
+                info[1] = rssi
+
+            # AD structures: length, type, value[length - 1]
+            i = 0
+            while i + 1 < len(data) and data[i]:
+                ad_len, ad_type = data[i], data[i + 1]
+                value = data[i + 2:i + 1 + ad_len]
+                if ad_type == _AD_COMPLETE_NAME or (ad_type == _AD_SHORT_NAME and not info[0]):
+                    info[0] = value.decode('utf-8', errors='ignore').strip('\x00').strip()
+                elif ad_type == _AD_MANUFACTURER_DATA and len(value) >= 2:
+                    company_id = value[0] | (value[1] << 8)
+                    # Same format bluetoothctl reports for ManufacturerData keys
+                    info[2] = f"0x{company_id:04x} ({company_id})"
+                i += 1 + ad_len
+
+    def _flush_csv(self):
+        """
+        Append buffered rows to the devices file with a single write. Caller must hold _data_lock.
+        On failure the rows stay buffered and are retried on the next flush.
+        """
+        data = self._csv_buf.getvalue()
+        if not data:
+            return True
+        try:
+            with open(self.options['devices_file'], 'a', newline='') as csvfile:
+                csvfile.write(data)
+                # Append-mode position is the file size, so rollover needn't stat the file
+                self._csv_bytes = csvfile.tell()
+        except Exception as e:
+            logging.error(f"[BT-Sniffer] Error writing buffered rows: {e}")
+            return False
+        self._csv_buf.seek(0)
+        self._csv_buf.truncate()
+        return True
 
-    def get_device_rssi(self, mac):
+    # ---------------- bluetoothctl session ----------------
+    def _btctl_start(self):
+        """Spawn the persistent bluetoothctl session. Caller must hold _btctl_lock."""
         try:
-            out = subprocess.check_output(f"bluetoothctl info {mac}", shell=True).decode()
-            for line in out.splitlines():
-                if "RSSI" in line:
-                    return int(line.split(":", 1)[1].strip())
-        except Exception:
-            pass
-        return 0
+            self._btctl = subprocess.Popen(
+                ['bluetoothctl'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            return True
+        except Exception as e:
+            logging.warning(f"[BT-Sniffer] Could not start bluetoothctl session: {e}")
+            self._btctl = None
+            return False
 
-    def get_device_type(self, mac):
+    def _btctl_stop(self):
+        """Terminate the persistent bluetoothctl session. Caller must hold _btctl_lock."""
+        proc, self._btctl = self._btctl, None
+        if proc is None:
+            return
         try:
-            out = subprocess.check_output(f"bluetoothctl info {mac}", shell=True).decode()
-            for line in out.splitlines():
-                if "Type" in line:
-                    dtype = line.split(":", 1)[1].strip()
-                    if "LE" in dtype:
-                        return "BLE"
+            proc.stdin.write(b"quit\n")
+            proc.stdin.flush()
+            proc.wait(timeout=2)
         except Exception:
-            pass
-        return "BT"
+            proc.kill()
+            try:
+                proc.wait(timeout=2)
+            except Exception:
+                pass
+
+    def _btctl_cmd(self, cmd, timeout=5.0):
+        """
+        Run a command through the persistent bluetoothctl session and return its output,
+        or None if the session is unavailable so callers can fall back to a one-shot call.
+        """
+        with self._btctl_lock:
+            if self._btctl is None or self._btctl.poll() is not None:
+                self._btctl_stop()
+                # Never respawn after on_unload, nothing would be left to clean the session up
+                if self._stop_event.is_set():
+                    return None
+                # Session recently stopped answering, don't pay the timeout again on every call
+                if time.time() < self._btctl_retry_at:
+                    return None
+                if not self._btctl_start():
+                    return None
+
+            proc = self._btctl
+            fd = proc.stdout.fileno()
+
+            # Discard queued event lines so they aren't attributed to this command
+            try:
+                while select.select([fd], [], [], 0)[0]:
+                    if not os.read(fd, 4096):
+                        self._btctl_stop()
+                        return None
+            except OSError:
+                self._btctl_stop()
+                return None
+
+            self._btctl_seq += 1
+            sentinel = _BTCTL_SENTINEL.format(self._btctl_seq)
+            try:
+                proc.stdin.write(f"{cmd}\n{sentinel}\n".encode())
+                proc.stdin.flush()
+            except (OSError, ValueError) as e:
+                logging.debug(f"[BT-Sniffer] bluetoothctl session write failed: {e}")
+                self._btctl_stop()
+                return None
+
+            buf = ""
+            end = time.time() + timeout
+            while True:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    # Late output would otherwise leak into the next command, start over instead.
+                    # Back off for a minute so a hung bluetoothd costs one timeout, not one per device.
+                    logging.debug(f"[BT-Sniffer] Timed out waiting for bluetoothctl '{cmd}', "
+                                  f"using one-shot calls for 60s")
+                    self._btctl_stop()
+                    self._btctl_retry_at = time.time() + 60
+                    return None
+                r, _, _ = select.select([fd], [], [], remaining)
+                if not r:
+                    continue
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    self._btctl_stop()
+                    return None
+                buf += chunk.decode(errors='ignore')
+                if any("Invalid command" in l and sentinel in l for l in buf.splitlines()):
+                    break
+
+            lines = []
+            for line in _ANSI_RE.sub('', buf).replace('\r', '\n').splitlines():
+                line = _PROMPT_RE.sub('', line)
+                if sentinel in line:
+                    if "Invalid command" in line:
+                        break
+                    continue
+                if line.lstrip().startswith(_BTCTL_EVENTS):
+                    continue
+                if line.strip() and line.strip() != cmd:
+                    lines.append(line)
+            return "\n".join(lines)
+
+    # ---------------- Info helpers ----------------
+    def _get_device_info(self, mac):
+        """Return (manufacturer, rssi, type) from a single `bluetoothctl info` call"""
+        mfgr, rssi, devtype = '', 0, "BT"
+        out = self._btctl_cmd(f"info {mac}")
+        if out is None:
+            try:
+                out = subprocess.check_output(
+                    ["bluetoothctl", "info", mac], stderr=subprocess.DEVNULL
+                ).decode(errors='ignore')
+            except Exception:
+                return mfgr, rssi, devtype
+
+        found_mfgr = found_rssi = found_type = False
+        for line in out.splitlines():
+            # One-shot output can also carry events about other devices
+            if line.lstrip().startswith(_BTCTL_EVENTS):
+                continue
+            if not found_mfgr and "Manufacturer" in line:
+                found_mfgr = True
+                mfgr = line.split(":", 1)[1].strip()
+            elif not found_rssi and "RSSI" in line:
+                found_rssi = True
+                try:
+                    rssi = int(line.split(":", 1)[1].strip())
+                except ValueError:
+                    pass
+            elif not found_type and "Type" in line:
+                found_type = True
+                if "LE" in line.split(":", 1)[-1]:
+                    devtype = "BLE"
+        return mfgr, rssi, devtype
 
     # ---------------- Rollover ----------------
     def check_rollover(self):
@@ -367,41 +807,60 @@ class btsniffer(plugins.Plugin):
         size_limit = self.options.get('file_size', 15000)
         upload_dir = self.uploader_options['path']
 
-        try:
-            if not os.path.exists(upload_dir):
-                os.makedirs(upload_dir, exist_ok=True)
-
-            if os.path.exists(file_path) and os.path.getsize(file_path) >= size_limit:
-                ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-                base_name = os.path.basename(file_path).replace('.csv', f'_{ts}.csv')
-                dest_path = os.path.join(upload_dir, base_name)
-
-                shutil.move(file_path, dest_path)
-                logging.info(f"[BT-Sniffer] Rolled over -> {dest_path}")
+        # Tracked size is kept current by every write, only stat once it says we're over
+        if self._csv_bytes < size_limit:
+            return
 
-                # Recreate CSV header for the new active file
-                self.write_csv_header()
-                self.data.clear()
-        except Exception as e:
-            logging.error(f"[BT-Sniffer] Rollover error: {e}")
+        with self._data_lock:
+            # Buffered rows belong to the file being rolled over
+            self._flush_csv()
+            try:
+                # Only retry directory creation if it failed at load time
+                if not self._dirs_ready:
+                    self._ensure_dirs()
+
+                self._csv_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                if self._csv_bytes >= size_limit:
+                    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    base_name = os.path.basename(file_path).replace('.csv', f'_{ts}.csv')
+                    dest_path = os.path.join(upload_dir, base_name)
+
+                    try:
+                        shutil.move(file_path, dest_path)
+                    except FileNotFoundError:
+                        # upload dir was removed since load, recreate it and retry once
+                        self._ensure_dirs()
+                        shutil.move(file_path, dest_path)
+                    logging.info(f"[BT-Sniffer] Rolled over -> {dest_path}")
+
+                    # Recreate CSV header for the new active file
+                    self.write_csv_header()
+                    self.data.clear()
+            except Exception as e:
+                logging.error(f"[BT-Sniffer] Rollover error: {e}")
 
     # ---------------- Internet Check ----------------
     def _check_internet(self):
-        """Quick check if internet is available"""
+        """Quick check if internet is available (TCP connect, no TLS)"""
+        # Pwnagotchi's on_internet_available recently confirmed connectivity
+        if self._net_ok_until > time.time():
+            return True
         try:
-            response = requests.get('https://api.wigle.net', timeout=5)
-            return response.status_code == 200
-        except Exception:
+            with socket.create_connection(('1.1.1.1', 53), timeout=1.5):
+                pass
+        except OSError:
             return False
+        return True
 
     # ---------------- Uploader ----------------
     def _list_csv_files(self):
         path = self.uploader_options['path']
         try:
-            files = [os.path.join(path, f) for f in os.listdir(path)
-                    if f.lower().endswith('.csv') and os.path.isfile(os.path.join(path, f))]
-            files.sort(key=lambda f: os.path.getmtime(f))
-            return files
+            # DirEntry caches type/stat info, avoiding separate isfile/getmtime calls per file
+            with os.scandir(path) as it:
+                entries = [e for e in it if e.name.lower().endswith('.csv') and e.is_file()]
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            return [e.path for e in entries]
         except Exception:
             return []
 
@@ -417,13 +876,19 @@ class btsniffer(plugins.Plugin):
             logging.warning(f"[BT-Sniffer] Missing WiGLE credentials for upload, skipping {file_path}.")
             return False
 
+        # Don't upload something we can't move out of the upload dir afterwards
+        if not self._dirs_ready and not self._ensure_dirs():
+            logging.warning(f"[BT-Sniffer] Upload directories unavailable, skipping {file_path}.")
+            return False
+
         try:
             auth = (username, token)
             logging.info(f"[BT-Sniffer] Uploading {file_path} to WiGLE...")
 
-            with open(file_path, "rb") as fp:
-                files = {"file": fp}
-                response = requests.post(url, files=files, auth=auth, timeout=120)
+            # Stream the file instead of letting requests buffer the whole multipart body
+            body = _MultipartUpload(file_path)
+            response = self._http.post(url, data=body, headers={'Content-Type': body.content_type},
+                                       auth=auth, timeout=120)
 
             if response.status_code == 200:
                 try:
@@ -433,12 +898,16 @@ class btsniffer(plugins.Plugin):
                         
                         # Move file to uploaded directory
                         uploaded_dir = self.uploader_options.get('uploaded_path', '/root/handshakes/uploaded/')
-                        os.makedirs(uploaded_dir, exist_ok=True)
                         file_name = os.path.basename(file_path)
                         uploaded_file_path = os.path.join(uploaded_dir, file_name)
                         
                         try:
-                            shutil.move(file_path, uploaded_file_path)
+                            try:
+                                shutil.move(file_path, uploaded_file_path)
+                            except FileNotFoundError:
+                                # uploaded_path was removed since load, recreate it and retry once
+                                self._ensure_dirs()
+                                shutil.move(file_path, uploaded_file_path)
                             logging.info(f"[BT-Sniffer] Moved uploaded file to: {uploaded_file_path}")
                             
                             # Delete from uploaded directory if remove_on_success is True
@@ -447,6 +916,12 @@ class btsniffer(plugins.Plugin):
                                 logging.info(f"[BT-Sniffer] Deleted uploaded file: {uploaded_file_path}")
                         except Exception as move_error:
                             logging.error(f"[BT-Sniffer] Error moving file to uploaded directory: {move_error}")
+                            # Already on WiGLE, take it out of the .csv upload queue so it isn't sent again
+                            if os.path.exists(file_path):
+                                try:
+                                    os.rename(file_path, file_path + '.uploaded')
+                                except OSError as rename_error:
+                                    logging.error(f"[BT-Sniffer] Could not mark {file_path} as uploaded: {rename_error}")
                         
                         return True
                     else:
@@ -473,14 +948,16 @@ class btsniffer(plugins.Plugin):
                 return
 
             logging.info(f"[BT-Sniffer] Starting upload of {len(files)} file(s)...")
-            for f in files:
-                self._upload_file(f)
-                time.sleep(1)
+            workers = max(1, int(self.options.get('upload_workers', 3)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(self._upload_file, files))
             logging.info("[BT-Sniffer] Upload batch complete")
 
     def on_internet_available(self, agent):
         """Called by Pwnagotchi when internet becomes available"""
         logging.info("[BT-Sniffer] Internet detected (on_internet_available), uploading files...")
+        # Pwnagotchi has just confirmed connectivity, so the periodic check needn't probe again
+        self._net_ok_until = max(self._net_ok_until, time.time() + 60)
         t = threading.Thread(target=self._upload_all, daemon=True)
         t.start()
 